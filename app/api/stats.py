@@ -2,22 +2,20 @@ from datetime import date
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.exceptions import HTTPException
 
-from app.services.stats_service import StatsQueryService
+from app.services.stats_batcher import StatsRequestBatcher
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
-def get_stats_query_service(request: Request) -> StatsQueryService:
-    return StatsQueryService(
-        redis=request.app.state.redis_api,
-        mongo=request.app.state.mongo_api,
-    )
+def get_stats_batcher(request: Request) -> StatsRequestBatcher:
+    # Shared instance so concurrent requests coalesce into one read
+    return request.app.state.stats_batcher
 
 
 @router.get("")
 async def get_stats(
     from_date: date = Query(...),
     to_date: date = Query(...),
-    service: StatsQueryService = Depends(get_stats_query_service),
+    service: StatsRequestBatcher = Depends(get_stats_batcher),
 ):
     if from_date > to_date:
         raise HTTPException(400, "from_date must be <= to_date")
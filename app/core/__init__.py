@@ -1,3 +1,5 @@
 from . import lifespan
+from . import log_config
 from . import config
-from . import redis_keys
\ No newline at end of file
+from . import redis_keys
+from . import agg_layout
\ No newline at end of file
@@ -0,0 +1,31 @@
+import struct
+
+# Canonical counter order inside every packed agg:{day}:{type} value.
+# Append only: a method's position is its slot in all stored values.
+PAYMENT_METHODS: tuple[str, ...] = ("apple_pay", "crypto", "paypal", "visa", "wire")
+
+METHOD_INDEX: dict[str, int] = {m: i for i, m in enumerate(PAYMENT_METHODS)}
+
+# Each slot is a signed 64-bit BITFIELD counter of cents
+COUNTER_TYPE = "i64"
+_COUNTER_SIZE = 8
+
+def counter_offset(index: int) -> str:
+    """
+    BITFIELD offset of a slot; '#' scales the index by the counter width.
+    """
+    return f"#{index}"
+
+def unpack_counters(value: bytes | None) -> dict[str, int]:
+    """
+    Decodes a packed value into {method: cents}, skipping untouched slots.
+    """
+    if not value:
+        return {}
+
+    # BITFIELD writes big-endian and only grows the string up to the
+    # highest slot written so far
+    count = len(value) // _COUNTER_SIZE
+    counters = struct.unpack(f">{count}q", value[: count * _COUNTER_SIZE])
+
+    return {PAYMENT_METHODS[i]: cents for i, cents in enumerate(counters) if cents}
@@ -18,7 +18,6 @@ class RedisSettings(BaseModel):
     port: int
     username: str
     password: str
-    decode_responses: bool = True
 
     # Discovery Keys
     tracked_days_key: str = "system:tracked_days"
@@ -39,6 +38,7 @@ class AppSettings(BaseModel):
     mongodb: MongoSettings
     csv_path: Path
     batch_size: int = 10
+    stream_maxlen: int = 1_000_000
     log_level : str = 'INFO'
 
 
@@ -46,12 +46,6 @@ class AppSettings(BaseModel):
 # Loader
 # ---------------------------------------------------------
 
-def _get_bool(value: str | None, default: bool) -> bool:
-    if value is None:
-        return default
-    return value.lower() in ("1", "true", "yes", "on")
-
-
 def load_settings() -> AppSettings:
     try:
         redis = RedisSettings(
@@ -59,10 +53,6 @@ def load_settings() -> AppSettings:
             port=int(os.environ.get("REDIS_PORT", 6379)),
             username=os.environ.get("REDIS_USERNAME", ""),
             password=os.environ.get("REDIS_PASSWORD", ""),
-            decode_responses=_get_bool(
-                os.environ.get("REDIS_DECODE_RESPONSES"),
-                True,
-            ),
             tracked_days_key=os.environ.get(
                 "REDIS_TRACKED_DAYS_KEY",
                 "system:tracked_days",
@@ -93,6 +83,7 @@ def load_settings() -> AppSettings:
                 )
             ),
             batch_size=int(os.environ.get("BATCH_SIZE", 10)),
+            stream_maxlen=int(os.environ.get("STREAM_MAXLEN", 1_000_000)),
             log_level=os.environ.get("LOG_LEVEL", "INFO")
         )
 
@@ -6,11 +6,14 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from app.core.config import settings
+from app.core.log_config import stop_logging
 from app.services.importer import CsvTransactionImporter
 from app.services.aggregator import RedisAggregationWorker
 from app.services.persistor import MongoPersistenceWorker
-from app.infrastructure.redis import create_redis_client
-from app.infrastructure.mongo import create_mongo_client
+from app.services.stats_service import StatsQueryService
+from app.services.stats_batcher import StatsRequestBatcher
+from app.infrastructure.redis import create_redis_client, create_redis_pool
+from app.infrastructure.mongo import create_mongo_client, ensure_indexes
 
 import logging
 
@@ -26,61 +29,72 @@ async def lifespan(app: FastAPI):
         "port": settings.redis.port,
         "password": settings.redis.password,
         "username": settings.redis.username,
-        "decode_responses": settings.redis.decode_responses
     }
 
     # ----------------------------
-    # Worker clients
+    # Redis clients
     # ----------------------------
-    redis_producer = create_redis_client(**redis_params)
-    redis_consumer = create_redis_client(**redis_params)
-    redis_persistor = create_redis_client(**redis_params)
-
-    mongo_writer_client = create_mongo_client(settings.mongodb.uri)
-    mongo_writer_db = mongo_writer_client[settings.mongodb.database]
-    mongo_writer_col = mongo_writer_db[settings.mongodb.collection]
+    # One bounded pool for every worker and the API: each command checks
+    # out its own connection, so the aggregator's blocking XREADGROUP
+    # only holds one socket while the others keep running.
+    # Replies stay raw bytes: packed aggregation values are binary and
+    # the aggregator decodes only the stream fields it needs.
+    redis_pool = create_redis_pool(
+        **redis_params, decode_responses=False, max_connections=64,
+    )
+    app.state.redis_pool = redis_pool
 
-    # ----------------------------
-    # API clients (read side)
-    # ----------------------------
-    redis_api = create_redis_client(**redis_params)
+    redis = create_redis_client(redis_pool)
 
-    mongo_reader_client = create_mongo_client(settings.mongodb.uri)
-    mongo_reader_db = mongo_reader_client[settings.mongodb.database]
-    mongo_reader_col = mongo_reader_db[settings.mongodb.collection]
+    # One pooled client serves both the persistor and the API
+    mongo_client = create_mongo_client(settings.mongodb.uri)
+    mongo_db = mongo_client[settings.mongodb.database]
+    mongo_col = mongo_db[settings.mongodb.collection]
+    await ensure_indexes(mongo_col)
 
-    # expose ONLY API clients
-    app.state.redis_api = redis_api
-    app.state.mongo_api = mongo_reader_col
+    # expose ONLY the API read side
+    stats_batcher = StatsRequestBatcher(
+        StatsQueryService(redis=redis, mongo=mongo_col),
+        max_batch_size=64,
+        wait_timeout_ms=10,
+    )
+    app.state.stats_batcher = stats_batcher
 
     # ----------------------------
     # Workers
     # ----------------------------
     importer = CsvTransactionImporter(
         file_path=settings.csv_path,
-        redis=redis_producer,
+        redis=redis,
         batch_size=settings.batch_size,
+        stream_maxlen=settings.stream_maxlen,
     )
 
     aggregator = RedisAggregationWorker(
-        redis=redis_consumer,
+        redis=redis,
         stream_name="transactions",
         group_name="aggregators",
         consumer_name="aggregator-1",
         batch_size=50,
+        block_ms=1_000,
+        max_batch_size=5_000,
+        dead_letter_stream="transactions:dead",
     )
 
     persistor = MongoPersistenceWorker(
-        redis=redis_persistor,
-        mongo_collection=mongo_writer_col,
+        redis=redis,
+        mongo_collection=mongo_col,
         retention_days=7,
         interval_seconds=10
     )
 
+    # Start order does not matter: the consumer group is created from id 0,
+    # so entries pushed before it exists are still delivered
     tasks = {
-        "importer": asyncio.create_task(importer.run(), name="importer"),
         "aggregator": asyncio.create_task(aggregator.run(), name="aggregator"),
         "persistor": asyncio.create_task(persistor.run(), name="persistor"),
+        "stats_batcher": asyncio.create_task(stats_batcher.run(), name="stats_batcher"),
+        "importer": asyncio.create_task(importer.run(), name="importer"),
     }
 
     def _log_done(t: asyncio.Task):
@@ -105,12 +119,10 @@ async def lifespan(app: FastAPI):
 
         await asyncio.gather(*tasks.values(), return_exceptions=True)
 
-        await redis_producer.close()
-        await redis_consumer.close()
-        await redis_persistor.close()
-        await redis_api.close()
+        await redis.aclose()
+        await redis_pool.aclose()
 
-        mongo_writer_client.close()
-        mongo_reader_client.close()
+        mongo_client.close()
 
         logger.info("System offline.")
+        stop_logging()
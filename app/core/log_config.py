@@ -0,0 +1,88 @@
+import logging
+import logging.config
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_DIR = "/logs"
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+# Listeners writing queued records from a background thread
+_listeners: list[QueueListener] = []
+
+
+def _queued(target: logging.Handler) -> QueueHandler:
+    """
+    Wraps a blocking handler so callers only enqueue the record; the
+    actual write happens on the listener thread.
+    """
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, target, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return QueueHandler(log_queue)
+
+
+def setup_logging() -> None:
+    stop_logging()
+
+    # Make sure log directory exists (important for Docker)
+    os.makedirs(LOG_DIR, exist_ok=True)
+    
+    # Get level from env (upper for safety)
+    log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    file_handler = logging.FileHandler(os.path.join(LOG_DIR, "app.log"))
+    file_handler.setFormatter(formatter)
+
+    logging.config.dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "handlers": {
+                "default": {
+                    "()": _queued,
+                    "target": console_handler,
+                },
+                "file": {
+                    "()": _queued,
+                    "target": file_handler,
+                },
+            },
+            "root": {
+                "level": log_level,  # Now dynamic from env
+                "handlers": ["default", "file"],
+            },
+            "loggers": {
+                "app.services.importer": {
+                    "level": log_level if log_level == 'DEBUG' else "INFO",
+                    "handlers": ["file", "default"],  # Add console for visibility
+                    "propagate": False,
+                },
+                "app.services.aggregator": {
+                    "level": log_level,
+                    "handlers": ["file"],
+                    "propagate": False,
+                },
+                "app.services.persistor": {
+                    "level": log_level,
+                    "handlers": ["file", "default"],  # Ensure dump messages hit console
+                    "propagate": False,
+                },
+            },
+
+        }
+    )
+
+
+def stop_logging() -> None:
+    """
+    Flushes pending records and stops the listener threads.
+    """
+    while _listeners:
+        _listeners.pop().stop()
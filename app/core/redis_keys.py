@@ -1,22 +1,29 @@
 from app.core.config import settings
 
+# Bound once at import time; settings never change at runtime
+AGG_PREFIX = settings.redis.agg_prefix
+TRACKED_DAYS_KEY = settings.redis.tracked_days_key
+VIRTUAL_CLOCK_KEY = settings.redis.virtual_clock_key
+
+# Offsets of the YYYY-MM-DD part in "{prefix}:YYYY-MM-DD:type"
+_DAY_START = len(AGG_PREFIX) + 1
+_DAY_END = _DAY_START + 10
+
 def get_tracked_days_key() -> str:
-    return settings.redis.tracked_days_key
+    return TRACKED_DAYS_KEY
 
 def get_virtual_clock_key() -> str:
-    return settings.redis.virtual_clock_key
+    return VIRTUAL_CLOCK_KEY
 
 def get_agg_key(day: str, tx_type: str) -> str:
     """
     Standardizes the key format: agg:YYYY-MM-DD:type
     """
-    prefix = settings.redis.agg_prefix
-    return f"{prefix}:{day}:{tx_type}"
+    return f"{AGG_PREFIX}:{day}:{tx_type}"
 
 def parse_day_from_key(key: str) -> str:
     """
     Used by the Persistor to extract the date from a key name.
     """
     # Key shape: agg:2026-01-01:deposit
-    parts = key.split(":")
-    return parts[1]
\ No newline at end of file
+    return key[_DAY_START:_DAY_END]
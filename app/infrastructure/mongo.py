@@ -1,4 +1,27 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 
-def create_mongo_client(uri: str) -> AsyncIOMotorClient:
-    return AsyncIOMotorClient(uri)
+# Holds every projected field so /stats range reads never touch the documents
+DATE_COVER_INDEX = "date_cover_idx"
+DATE_COVER_KEYS = [("date", 1), ("deposits", 1), ("withdrawals", 1)]
+
+def create_mongo_client(
+    uri: str,
+    max_pool_size: int = 50,
+    min_pool_size: int = 5,
+    max_idle_time_ms: int = 60_000,
+    wait_queue_timeout_ms: int = 2_000,
+    server_selection_timeout_ms: int = 2_000,
+) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        uri,
+        maxPoolSize=max_pool_size,
+        minPoolSize=min_pool_size,
+        maxIdleTimeMS=max_idle_time_ms,
+        waitQueueTimeoutMS=wait_queue_timeout_ms,
+        serverSelectionTimeoutMS=server_selection_timeout_ms,
+    )
+
+
+async def ensure_indexes(collection: AsyncIOMotorCollection) -> None:
+    # create_index is a no-op when the index already exists
+    await collection.create_index(DATE_COVER_KEYS, name=DATE_COVER_INDEX)
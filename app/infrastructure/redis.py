@@ -1,4 +1,13 @@
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 
-def create_redis_client(**params) -> Redis:
-    return Redis(**params)
+def create_redis_pool(max_connections: int = 64, **params) -> BlockingConnectionPool:
+    # Bounded pool: callers wait for a free socket instead of opening more.
+    # redis-py parses replies with hiredis on its own whenever it is installed.
+    return BlockingConnectionPool(
+        max_connections=max_connections,
+        **params,
+    )
+
+def create_redis_client(pool: BlockingConnectionPool) -> Redis:
+    # Clients are thin handles; closing the pool is the owner's job
+    return Redis(connection_pool=pool)
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import csv
-from datetime import datetime
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+
 
 TIMESTAMP_COL = "timestamp"
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
@@ -14,23 +17,30 @@ def sort_transactions_csv(
     target: Path,
 ) -> None:
     with source.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter=DELIMITER)
-
-        rows = list(reader)
-
-    def parse_ts(row: dict) -> datetime:
-        return datetime.strptime(row[TIMESTAMP_COL], TIMESTAMP_FORMAT)
-
-    rows.sort(key=parse_ts)
-
-    with target.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=reader.fieldnames,
+        fieldnames = next(csv.reader(f, delimiter=DELIMITER))
+
+    # Read every column as a string so values are written back untouched
+    table = pv.read_csv(
+        source,
+        parse_options=pv.ParseOptions(delimiter=DELIMITER),
+        convert_options=pv.ConvertOptions(
+            column_types={name: pa.string() for name in fieldnames},
+        ),
+    )
+
+    ts = pc.strptime(table[TIMESTAMP_COL], format=TIMESTAMP_FORMAT, unit="s")
+    indices = pc.sort_indices(ts)
+
+    pv.write_csv(
+        table.take(indices),
+        target,
+        # Plain CSV like the source: no quoted values or column names
+        write_options=pv.WriteOptions(
             delimiter=DELIMITER,
-        )
-        writer.writeheader()
-        writer.writerows(rows)
+            quoting_style="none",
+            quoting_header="none",
+        ),
+    )
 
 
 if __name__ == "__main__":
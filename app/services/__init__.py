@@ -1,4 +1,5 @@
 from . import importer
 from . import aggregator
 from . import persistor
-from . import stats_service
\ No newline at end of file
+from . import stats_service
+from . import stats_batcher
\ No newline at end of file
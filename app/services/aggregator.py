@@ -1,13 +1,42 @@
 import asyncio
 import logging
-from datetime import datetime
+import time
+from collections import defaultdict
+from datetime import date, datetime
 from typing import Any
 
 from redis.asyncio import Redis
-from app.core.redis_keys import get_agg_key, get_tracked_days_key, get_virtual_clock_key
+from redis.commands.core import BitFieldOperation
+from app.core.agg_layout import COUNTER_TYPE, METHOD_INDEX, PAYMENT_METHODS, counter_offset
+from app.core.redis_keys import TRACKED_DAYS_KEY, VIRTUAL_CLOCK_KEY, get_agg_key
 
 logger = logging.getLogger(__name__)
 
+# Stream payloads arrive as raw bytes; look methods up without decoding them
+_METHOD_SLOTS: dict[bytes, int] = {m.encode(): i for m, i in METHOD_INDEX.items()}
+
+def _has_valid_time(ts_str: str) -> bool:
+    """
+    Cheap check of the HH:MM:SS part of an ISO timestamp, so every accepted
+    timestamp is also a valid virtual clock.
+    """
+    hh, mm, ss = ts_str[11:13], ts_str[14:16], ts_str[17:19]
+    if not (
+        ts_str[13:14] == ":" and ts_str[16:17] == ":"
+        and hh.isdigit() and mm.isdigit() and ss.isdigit()
+        and hh < "24" and mm < "60" and ss < "60"
+    ):
+        return False
+    if len(ts_str) == 19:
+        return True
+
+    # Rare: fractional seconds or an offset, let the parser decide
+    try:
+        datetime.fromisoformat(ts_str)
+    except ValueError:
+        return False
+    return True
+
 class RedisAggregationWorker:
     def __init__(
         self,
@@ -16,40 +45,66 @@ class RedisAggregationWorker:
         group_name: str = "aggregators",
         consumer_name: str = "aggregator-1",
         batch_size: int = 50,
-        block_ms: int = 5_000,
+        block_ms: int = 1_000,
+        max_batch_size: int = 5_000,
+        log_interval_seconds: float = 1.0,
+        dead_letter_stream: str | None = None,
     ) -> None:
         self.redis = redis
         self.stream_name = stream_name
+        # Messages that can never be aggregated are moved here, not dropped
+        self.dead_letter_stream = dead_letter_stream or f"{stream_name}:dead"
         self.group_name = group_name
         self.consumer_name = consumer_name
         self.batch_size = batch_size
         self.block_ms = block_ms
+        self.max_batch_size = max(max_batch_size, batch_size)
+        self.log_interval = log_interval_seconds
         self.local_virtual_clock: datetime | None = None
+        # Same instant as ISO text; zero-padded ISO strings order like datetimes
+        self.local_virtual_clock_str: str | None = None
+
+        # Progress is reported at most once per log_interval, not per batch
+        self._aggregated_since_log = 0
+        self._last_log = time.monotonic()
 
     async def run(self) -> None:
         await self._ensure_group()
         
         # Initialize clock using Shared Contract
-        raw_clock = await self.redis.get(get_virtual_clock_key())
+        raw_clock = await self.redis.get(VIRTUAL_CLOCK_KEY)
         if raw_clock:
             clock_str = raw_clock if isinstance(raw_clock, str) else raw_clock.decode()
             self.local_virtual_clock = datetime.fromisoformat(clock_str)
+            self.local_virtual_clock_str = self.local_virtual_clock.isoformat()
         
         logger.info(
             "Worker started. Group: %s, Clock: %s",
             self.group_name, self.local_virtual_clock,
         )
 
+        # A full read means a backlog is waiting: grow the batch and skip
+        # BLOCK; a partial read shrinks it back towards batch_size.
+        count = self.batch_size
+        backlog = False
+
         try:
             while True:
                 response = await self.redis.xreadgroup(
                     groupname=self.group_name,
                     consumername=self.consumer_name,
                     streams={self.stream_name: ">"},
-                    count=self.batch_size,
-                    block=self.block_ms,
+                    count=count,
+                    block=None if backlog else self.block_ms,
                 )
 
+                received = sum(len(messages) for _, messages in response or ())
+                backlog = received >= count
+                if backlog:
+                    count = min(count * 2, self.max_batch_size)
+                else:
+                    count = max(count // 2, self.batch_size)
+
                 if not response:
                     continue
 
@@ -63,41 +118,228 @@ class RedisAggregationWorker:
             raise
 
     async def _handle_batch(self, response: list[Any]) -> None:
-        pipe = self.redis.pipeline()
-        processed_count = 0
-        
+        # Pre-pass: validate each message and split it into columns
+        message_ids: list[Any] = []
+        # (id, payload, reason) of messages that can never be aggregated
+        rejected: list[tuple[Any, dict[bytes, bytes], str]] = []
+        timestamps: list[str] = []
+        days: list[str] = []
+        tx_types: list[bytes] = []
+        method_slots: list[int] = []
+        amounts_cents: list[int] = []
+
         for _, messages in response:
             for message_id, payload in messages:
                 try:
-                    ts = datetime.fromisoformat(payload["timestamp"])
-                    day = ts.date().isoformat()
-                    tx_type = payload["type"]
-                    method = payload["payment_method"]
-                    amount = round(float(payload["amount"]), 2)
-
-                    # Aggregate via Shared Contract
-                    agg_key = get_agg_key(day, tx_type)
-                    pipe.hincrbyfloat(agg_key, method, amount)
-
-                    # Register Day via Shared Contract
-                    pipe.sadd(get_tracked_days_key(), day)
-
-                    # Virtual Clock via Shared Contract
-                    if self.local_virtual_clock is None or ts > self.local_virtual_clock:
-                        self.local_virtual_clock = ts
-                        pipe.set(get_virtual_clock_key(), ts.isoformat())
-
-                    pipe.xack(self.stream_name, self.group_name, message_id)
-                    processed_count += 1
-                    
-                except Exception:
-                    logger.exception("Skipping malformed message: %s", message_id)
+                    # Only the timestamp is needed as text (day, clock)
+                    ts_str = payload[b"timestamp"].decode()
+                    # Cheap shape checks; only the day part is parsed per message,
+                    # so a bogus day can never be tracked
+                    if (
+                        not ts_str.isascii()
+                        or ts_str[4:5] != "-" or ts_str[7:8] != "-" or ts_str[10:11] != "T"
+                        or not _has_valid_time(ts_str)
+                    ):
+                        raise ValueError(f"Invalid timestamp: {ts_str!r}")
+                    date.fromisoformat(ts_str[:10])
+                    tx_type = payload[b"type"]
+                    method = payload[b"payment_method"]
+                    # Integer cents let Redis use integer counters instead of float math
+                    amount_cents = round(float(payload[b"amount"]) * 100)
+                except Exception as exc:
+                    rejected.append((message_id, payload, f"malformed: {exc!r}"))
+                    continue
+
+                # Unknown methods have no slot in the packed layout
+                method_slot = _METHOD_SLOTS.get(method)
+                if method_slot is None:
+                    rejected.append(
+                        (message_id, payload, f"unknown payment method {method.decode(errors='replace')!r}")
+                    )
                     continue
 
+                message_ids.append(message_id)
+                timestamps.append(ts_str)
+                # ISO prefix is the calendar day, no date() round trip needed
+                days.append(ts_str[:10])
+                tx_types.append(tx_type)
+                method_slots.append(method_slot)
+                amounts_cents.append(amount_cents)
+
+        # Only dead-lettered messages may be acknowledged along with the batch
+        rejected_ids = await self._dead_letter(rejected) if rejected else []
+
+        processed_count = len(message_ids)
+        if not processed_count:
+            if rejected_ids:
+                await self.redis.xack(self.stream_name, self.group_name, *rejected_ids)
+            return
+
+        # Sum locally so each (day, type, method) costs one counter increment
+        totals: defaultdict[tuple[str, bytes, int], int] = defaultdict(int)
+        for key, cents in zip(zip(days, tx_types, method_slots), amounts_cents):
+            totals[key] += cents
+
+        pipe = self.redis.pipeline(transaction=False)
+
+        # Aggregate via Shared Contract: one BITFIELD per packed (day, type) value
+        bitfields: dict[tuple[str, bytes], BitFieldOperation] = {}
+        for (day, tx_type, slot), cents in totals.items():
+            op = bitfields.get((day, tx_type))
+            if op is None:
+                key = get_agg_key(day, tx_type.decode())
+                op = bitfields[(day, tx_type)] = pipe.bitfield(key)
+            op.incrby(COUNTER_TYPE, counter_offset(slot), cents)
+
+        for op in bitfields.values():
+            op.execute()
+
+        # Register Days via Shared Contract: one SADD for the whole batch
+        pipe.sadd(TRACKED_DAYS_KEY, *set(days))
+
+        # Redis never rolls back the other commands when one fails, so take
+        # every outcome and only acknowledge what was actually applied
+        outcomes = await pipe.execute(raise_on_error=False)
+
+        failed: dict[tuple[str, bytes], Exception] = {
+            group: outcome
+            for group, outcome in zip(bitfields, outcomes)
+            if isinstance(outcome, Exception)
+        }
+        if failed:
+            failed = await self._apply_to_legacy_hashes(failed, totals)
+
+        for (day, tx_type), exc in failed.items():
+            logger.error(
+                "Aggregation into %s failed, leaving its messages pending: %s",
+                get_agg_key(day, tx_type.decode()), exc,
+            )
+
+        if isinstance(outcomes[-1], Exception):
+            logger.error("Tracking days %s failed: %s", sorted(set(days)), outcomes[-1])
+
+        if failed:
+            applied = [
+                i for i, group in enumerate(zip(days, tx_types)) if group not in failed
+            ]
+            message_ids = [message_ids[i] for i in applied]
+            timestamps = [timestamps[i] for i in applied]
+
+        processed_count = len(message_ids)
+
+        pipe = self.redis.pipeline(transaction=False)
+
+        # Virtual Clock via Shared Contract: compare raw ISO strings and
+        # only parse the latest one
+        latest = self._latest_clock(timestamps) if timestamps else None
+        if latest is not None:
+            batch_clock_str, batch_clock = latest
+            if self.local_virtual_clock_str is None or batch_clock_str > self.local_virtual_clock_str:
+                self.local_virtual_clock = batch_clock
+                self.local_virtual_clock_str = batch_clock_str
+                pipe.set(VIRTUAL_CLOCK_KEY, batch_clock.isoformat())
+
+        # XACK is variadic: acknowledge every applied message in one command
+        if message_ids or rejected_ids:
+            pipe.xack(self.stream_name, self.group_name, *message_ids, *rejected_ids)
+
         await pipe.execute()
-        logger.info("Aggregated %d transactions. Clock: %s", processed_count, self.local_virtual_clock)
-        # Give other tasks (like the Persistor) a chance to run
-        await asyncio.sleep(0.01)
+
+        self._aggregated_since_log += processed_count
+        now = time.monotonic()
+        if now - self._last_log >= self.log_interval:
+            logger.info(
+                "Aggregated %d transactions. Clock: %s",
+                self._aggregated_since_log, self.local_virtual_clock,
+            )
+            self._aggregated_since_log = 0
+            self._last_log = now
+
+        # Give other tasks (like the Persistor) a chance to run without
+        # delaying the next read when a backlog is waiting
+        await asyncio.sleep(0)
+
+    async def _dead_letter(
+        self,
+        rejected: list[tuple[Any, dict[bytes, bytes], str]],
+    ) -> list[Any]:
+        """
+        Copies rejected messages to the dead-letter stream with their reason.
+        Returns the ids that were stored and can be acknowledged.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for message_id, payload, reason in rejected:
+            logger.warning(
+                "Dead-lettering message %s to %s: %s",
+                message_id, self.dead_letter_stream, reason,
+            )
+            pipe.xadd(
+                self.dead_letter_stream,
+                {**payload, b"dead_letter_id": message_id, b"dead_letter_reason": reason},
+            )
+        outcomes = await pipe.execute(raise_on_error=False)
+
+        stored: list[Any] = []
+        for (message_id, _, _), outcome in zip(rejected, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(
+                    "Dead-lettering message %s failed, leaving it pending: %s",
+                    message_id, outcome,
+                )
+            else:
+                stored.append(message_id)
+
+        return stored
+
+    async def _apply_to_legacy_hashes(
+        self,
+        failed: dict[tuple[str, bytes], Exception],
+        totals: dict[tuple[str, bytes, int], int],
+    ) -> dict[tuple[str, bytes], Exception]:
+        """
+        Days written before the packed layout are still hashes: keep adding
+        to them with HINCRBYFLOAT until the persistor archives them.
+        Returns the groups that still could not be applied.
+        """
+        keys = {group: get_agg_key(group[0], group[1].decode()) for group in failed}
+
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys.values():
+            pipe.type(key)
+        key_types = await pipe.execute(raise_on_error=False)
+
+        legacy = {
+            group
+            for group, key_type in zip(keys, key_types)
+            if key_type in (b"hash", "hash")
+        }
+        if not legacy:
+            return failed
+
+        pipe = self.redis.pipeline(transaction=False)
+        applied: list[tuple[str, bytes]] = []
+        for (day, tx_type, slot), cents in totals.items():
+            if (day, tx_type) in legacy:
+                pipe.hincrbyfloat(keys[(day, tx_type)], PAYMENT_METHODS[slot], cents / 100)
+                applied.append((day, tx_type))
+        outcomes = await pipe.execute(raise_on_error=False)
+
+        remaining = {group: exc for group, exc in failed.items() if group not in legacy}
+        for group, outcome in zip(applied, outcomes):
+            if isinstance(outcome, Exception):
+                remaining[group] = outcome
+
+        return remaining
+
+    @staticmethod
+    def _latest_clock(timestamps: list[str]) -> tuple[str, datetime] | None:
+        # The pre-pass only accepts parsable timestamps, so parse the maximum
+        batch_clock_str = max(timestamps)
+        try:
+            return batch_clock_str, datetime.fromisoformat(batch_clock_str)
+        except ValueError:
+            logger.error("Ignoring malformed batch clock: %r", batch_clock_str)
+            return None
 
     async def _ensure_group(self) -> None:
         try:
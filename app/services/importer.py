@@ -1,14 +1,23 @@
 import asyncio
 import logging
 from pathlib import Path
-from typing import Any
 
-import aiofiles
+import pyarrow as pa
+import pyarrow.csv as pv
 from redis.asyncio import Redis
 
 
 logger = logging.getLogger(__name__)
 
+# Size of each block handed to the C CSV tokenizer
+READ_BLOCK_SIZE = 1 << 16
+
+STREAM_NAME = b"transactions"
+SLEEP_COL = "sleep_ms"
+
+# A paced row: (sleep_ms, pre-encoded XADD fields)
+Transaction = tuple[int, dict[bytes, bytes]]
+
 
 class CsvTransactionImporter:
 
@@ -17,6 +26,9 @@ class CsvTransactionImporter:
         file_path: Path,
         redis: Redis,
         batch_size: int = 10,
+        flush_size: int = 100,
+        flush_interval_ms: int = 5,
+        stream_maxlen: int = 1_000_000,
     ) -> None:
 
         if not file_path.exists():
@@ -25,11 +37,20 @@ class CsvTransactionImporter:
         self.file_path = file_path
         self.redis = redis
         self.batch_size = batch_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.stream_maxlen = stream_maxlen
+        self._pushed = 0
 
-        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(
+        self._queue: asyncio.Queue[Transaction] = asyncio.Queue(
             maxsize=batch_size * 2
         )
 
+        # Paced rows waiting to be sent; drained by the flusher in pipelines
+        self._outbox: asyncio.Queue[tuple[bytes, dict[bytes, bytes]]] = asyncio.Queue(
+            maxsize=flush_size * 2
+        )
+
     async def run(self) -> None:
         logger.info(
             "CSV importer started",
@@ -43,10 +64,12 @@ class CsvTransactionImporter:
             asyncio.create_task(self._worker(i), name=f"csv-worker-{i}")
             for i in range(self.batch_size)
         ]
+        flusher = asyncio.create_task(self._flusher(), name="csv-flusher")
 
         try:
             await self._producer()
             await self._queue.join()
+            await self._outbox.join()
 
             logger.info("CSV importer finished successfully")
 
@@ -61,6 +84,7 @@ class CsvTransactionImporter:
         finally:
             for w in workers:
                 w.cancel()
+            flusher.cancel()
 
     # -------------------------------------
     # Producer – strictly sequential reader
@@ -70,31 +94,90 @@ class CsvTransactionImporter:
 
         produced = 0
 
-        async with aiofiles.open(self.file_path, mode="r") as f:
-            header: list[str] | None = None
+        # Reading, parsing and encoding run in a thread so the event loop
+        # keeps draining the queue; only one 64 KB block is resident at a time
+        source = await asyncio.to_thread(
+            pa.input_stream, str(self.file_path), buffer_size=READ_BLOCK_SIZE,
+        )
 
-            async for line in f:
-                line = line.rstrip("\n")
+        try:
+            reader = await asyncio.to_thread(self._open_reader, source)
+            logger.debug("CSV header loaded: %s", reader.schema.names)
 
-                if not line:
-                    continue
+            while True:
+                chunk = await asyncio.to_thread(self._read_next_chunk, reader)
 
-                if header is None:
-                    header = line.split(",")
-                    logger.debug("CSV header loaded: %s", header)
-                    continue
+                if chunk is None:
+                    break
 
-                values = line.split(",")
-                row = dict(zip(header, values))
+                for tx in chunk:
+                    await self._queue.put(tx)
+                    produced += 1
 
-                await self._queue.put(row)
-                produced += 1
+                    if produced % 1_000 == 0:
+                        logger.info("Produced %d rows", produced)
 
-                if produced % 1_000 == 0:
-                    logger.info("Produced %d rows", produced)
+        finally:
+            source.close()
 
         logger.info("CSV producer finished. Total rows: %d", produced)
 
+    def _open_reader(self, source: pa.NativeFile) -> pv.CSVStreamingReader:
+        with self.file_path.open("r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\n").split(",")
+
+        # Keep every column as a string: rows are forwarded verbatim to Redis
+        return pv.open_csv(
+            source,
+            read_options=pv.ReadOptions(block_size=READ_BLOCK_SIZE),
+            convert_options=pv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+            ),
+        )
+
+    @staticmethod
+    def _encode_batch(batch: pa.RecordBatch) -> list[Transaction]:
+        """
+        Parses sleep_ms once and encodes the remaining columns to the
+        bytes Redis expects, so workers only sleep and forward.
+        """
+        names = batch.schema.names
+        sleep_idx = names.index(SLEEP_COL)
+        field_names = [
+            (i, name.encode()) for i, name in enumerate(names) if i != sleep_idx
+        ]
+
+        columns = [column.to_pylist() for column in batch.columns]
+        encoded: list[Transaction] = []
+
+        for values in zip(*columns):
+            try:
+                sleep_ms = int(values[sleep_idx])
+            except Exception:
+                logger.warning(
+                    "Invalid sleep_ms value: %r (row=%r)",
+                    values[sleep_idx],
+                    dict(zip(names, values)),
+                )
+                continue
+
+            fields = {name: values[i].encode() for i, name in field_names}
+            encoded.append((sleep_ms, fields))
+
+        return encoded
+
+    @classmethod
+    def _read_next_chunk(
+        cls,
+        reader: pv.CSVStreamingReader,
+    ) -> list[Transaction] | None:
+        try:
+            batch = reader.read_next_batch()
+        except StopIteration:
+            return None
+
+        return cls._encode_batch(batch)
+
     # -------------------------------------
     # Workers – concurrent bounded senders
     # -------------------------------------
@@ -103,9 +186,9 @@ class CsvTransactionImporter:
 
         try:
             while True:
-                row = await self._queue.get()
+                tx = await self._queue.get()
                 try:
-                    await self._process_row(row, worker_id)
+                    await self._process_row(tx)
                 finally:
                     self._queue.task_done()
 
@@ -113,36 +196,76 @@ class CsvTransactionImporter:
             logger.debug("Worker %s cancelled", worker_id)
             raise
 
-    async def _process_row(
-        self,
-        row: dict[str, Any],
-        worker_id: int,
-    ) -> None:
-        try:
-            sleep_ms = int(row["sleep_ms"])
-        except Exception:
-            logger.warning(
-                "Invalid sleep_ms value: %r (row=%r)",
-                row.get("sleep_ms"),
-                row,
-            )
-            return
+    async def _process_row(self, tx: Transaction) -> None:
+        sleep_ms, fields = tx
 
         await asyncio.sleep(sleep_ms / 1000)
 
+        await self._outbox.put((STREAM_NAME, fields))
+
+    # -------------------------------------
+    # Flusher – batches XADDs into pipelines
+    # -------------------------------------
+    async def _flusher(self) -> None:
+        logger.debug("Flusher started")
+
+        try:
+            while True:
+                batch = [await self._outbox.get()]
+                deadline = asyncio.get_running_loop().time() + self.flush_interval
+
+                while len(batch) < self.flush_size:
+                    timeout = deadline - asyncio.get_running_loop().time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self._outbox.get(), timeout)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+
+                try:
+                    await self._send_batch(batch)
+                finally:
+                    for _ in batch:
+                        self._outbox.task_done()
+
+        except asyncio.CancelledError:
+            logger.debug("Flusher cancelled")
+            raise
+
+    async def _send_batch(
+        self,
+        batch: list[tuple[bytes, dict[bytes, bytes]]],
+    ) -> None:
         try:
-            await self.redis.xadd("transactions", row)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for stream, fields in batch:
+                    # "~" trimming keeps the stream bounded at near-zero cost
+                    pipe.xadd(
+                        stream,
+                        fields,
+                        maxlen=self.stream_maxlen,
+                        approximate=True,
+                    )
+                await pipe.execute()
 
         except Exception:
             logger.exception(
-                "Failed to push transaction to redis (worker=%s, timestamp=%s)",
-                worker_id,
-                row.get("timestamp"),
+                "Failed to push %d transactions to redis (first timestamp=%s)",
+                len(batch),
+                batch[0][1].get(b"timestamp"),
             )
             return
 
-        logger.debug(
-            "Transaction pushed (worker=%s, timestamp=%s)",
-            worker_id,
-            row.get("timestamp"),
-        )
+        previous = self._pushed
+        self._pushed += len(batch)
+
+        # Progress every 1000 rows instead of a record per transaction
+        if self._pushed // 1_000 > previous // 1_000 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Pushed %d rows (last ts=%s)",
+                self._pushed,
+                batch[-1][1].get(b"timestamp"),
+            )
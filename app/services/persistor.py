@@ -2,9 +2,12 @@ import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from redis.asyncio import Redis
 
-from app.core.redis_keys import get_agg_key, get_tracked_days_key, get_virtual_clock_key
+from app.core.agg_layout import unpack_counters
+from app.core.redis_keys import TRACKED_DAYS_KEY, VIRTUAL_CLOCK_KEY, get_agg_key, parse_day_from_key
 
 logger = logging.getLogger(__name__)
 
@@ -43,65 +46,175 @@ class MongoPersistenceWorker:
         # Heartbeat log to prove the loop is spinning
         logger.debug("Persistor heartbeat: checking for data to archive...")
         
-        raw_clock = await self.redis.get(get_virtual_clock_key())
+        raw_clock = await self.redis.get(VIRTUAL_CLOCK_KEY)
         if not raw_clock:
             logger.info("Persistor: No virtual clock found yet.")
             return
 
         clock_str = raw_clock if isinstance(raw_clock, str) else raw_clock.decode()
         system_clock = datetime.fromisoformat(clock_str)
-        boundary_date = (system_clock - timedelta(days=self.retention_days)).date()
+        # ISO YYYY-MM-DD strings sort like dates, so compare them directly
+        boundary_str = (system_clock - timedelta(days=self.retention_days)).date().isoformat()
         
-        tracked_days = await self.redis.smembers(get_tracked_days_key())
+        tracked_days = await self.redis.smembers(TRACKED_DAYS_KEY)
         
         if not tracked_days:
             return
 
-        for day_bytes in tracked_days:
-            day_str = day_bytes if isinstance(day_bytes, str) else day_bytes.decode()
-            current_day = datetime.fromisoformat(day_str).date()
+        tracked_days = {d if isinstance(d, str) else d.decode() for d in tracked_days}
 
-            if current_day <= boundary_date:
-                # Add a specific log before the network call to Mongo
+        historical_days: list[str] = []
+
+        for day_str in tracked_days:
+            if day_str <= boundary_str:
                 logger.info(f"Day {day_str} identified as historical. Moving...")
-                await self._move_day_to_mongo(day_str)
-                
-                # Yield control after every single day migration
-                await asyncio.sleep(0.01)
+                historical_days.append(day_str)
+
+        if historical_days:
+            await self._move_days_to_mongo(historical_days)
+
+    async def _move_days_to_mongo(self, days: list[str]) -> None:
+        keys = [
+            get_agg_key(day_str, tx_type)
+            for day_str in days
+            for tx_type in ("deposit", "withdrawal")
+        ]
+        # One MGET reads the packed values of every historical day
+        raw = await self.redis.mget(keys)
+        values: list[dict[str, float] | None] = [
+            None if value is None else self._packed_amounts(value) for value in raw
+        ]
+
+        # MGET also answers nil for keys of another type: hashes from the
+        # pre-BITFIELD layout are read with HGETALL, any other type leaves
+        # its day in Redis untouched instead of being deleted unarchived
+        skipped_days = await self._read_legacy_values(keys, values)
+
+        now = datetime.now(timezone.utc)
+        ops: list[UpdateOne] = []
+        op_days: list[str] = []
+        # Only keys that were actually read are removed, per archived day
+        cleanup: dict[str, list[str]] = {}
+
+        for i, day_str in enumerate(days):
+            if day_str in skipped_days:
+                continue
+
+            deposits, withdrawals = values[2 * i], values[2 * i + 1]
+            op = self._build_day_update(day_str, deposits or {}, withdrawals or {}, now)
+            if op is not None:
+                ops.append(op)
+                op_days.append(day_str)
+
+            cleanup[day_str] = [
+                key
+                for key, value in ((keys[2 * i], deposits), (keys[2 * i + 1], withdrawals))
+                if value is not None
+            ]
+
+        if ops:
+            try:
+                await self.mongo.bulk_write(ops, ordered=False)
+            except BulkWriteError as exc:
+                # Unordered writes commit every other upsert before raising:
+                # those days must still be cleaned up, or the next cycle
+                # would $inc them a second time
+                failed_days = {
+                    op_days[error["index"]] for error in exc.details.get("writeErrors", [])
+                }
+                logger.error(
+                    "Archiving failed for days %s, keeping them in Redis: %s",
+                    sorted(failed_days), exc.details.get("writeErrors"),
+                )
+                for day_str in failed_days:
+                    cleanup.pop(day_str, None)
+                logger.info("Archived %d days to MongoDB.", len(ops) - len(failed_days))
+            else:
+                logger.info("Archived %d days to MongoDB.", len(ops))
+
+        # Yield control once after the batch migration
+        await asyncio.sleep(0)
+
+        if not cleanup:
+            return
 
-    async def _move_day_to_mongo(self, day_str: str) -> None:
-        deposit_key = get_agg_key(day_str, "deposit")
-        withdrawal_key = get_agg_key(day_str, "withdrawal")
+        archived_days = list(cleanup)
+        cleanup_keys = [key for day_keys in cleanup.values() for key in day_keys]
 
+        # Cleanup only runs for days whose upsert has succeeded
         async with self.redis.pipeline() as pipe:
-            pipe.hgetall(deposit_key)
-            pipe.hgetall(withdrawal_key)
-            deposits, withdrawals = await pipe.execute()
-
-        if not deposits and not withdrawals:
-            await self.redis.srem(get_tracked_days_key(), day_str)
-            return
+            if cleanup_keys:
+                pipe.delete(*cleanup_keys)
+            pipe.srem(TRACKED_DAYS_KEY, *archived_days)
+            await pipe.execute()
 
+    async def _read_legacy_values(
+        self,
+        keys: list[str],
+        values: list[dict[str, float] | None],
+    ) -> set[str]:
+        missing = [i for i, value in enumerate(values) if value is None]
+        if not missing:
+            return set()
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for i in missing:
+                pipe.type(keys[i])
+            key_types = await pipe.execute()
+
+        legacy: list[int] = []
+        unreadable: set[str] = set()
+        for i, key_type in zip(missing, key_types):
+            if isinstance(key_type, bytes):
+                key_type = key_type.decode()
+            if key_type == "hash":
+                legacy.append(i)
+            elif key_type != "none":
+                logger.error(
+                    "Not archiving %s: expected a packed string value, found a %s",
+                    keys[i], key_type,
+                )
+                unreadable.add(parse_day_from_key(keys[i]))
+
+        if legacy:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for i in legacy:
+                    pipe.hgetall(keys[i])
+                hashes = await pipe.execute()
+
+            # Legacy hashes hold HINCRBYFLOAT totals in currency units
+            for i, fields in zip(legacy, hashes):
+                values[i] = {
+                    (m.decode() if isinstance(m, bytes) else m): float(amount)
+                    for m, amount in fields.items()
+                }
+
+        return unreadable
+
+    @staticmethod
+    def _packed_amounts(value: bytes) -> dict[str, float]:
+        # Redis holds integer cents; Mongo keeps amounts in currency units
+        return {m: cents / 100 for m, cents in unpack_counters(value).items()}
+
+    @staticmethod
+    def _build_day_update(
+        day_str: str,
+        deposits: dict[str, float],
+        withdrawals: dict[str, float],
+        now: datetime,
+    ) -> UpdateOne | None:
         update_payload = {}
-        for method, val in deposits.items():
-            m_name = method if isinstance(method, str) else method.decode()
-            update_payload[f"deposits.{m_name}"] = round(float(val), 2)
-            
-        for method, val in withdrawals.items():
-            m_name = method if isinstance(method, str) else method.decode()
-            update_payload[f"withdrawals.{m_name}"] = round(float(val), 2)
-
-        if update_payload:
-            await self.mongo.update_one(
-                {"date": day_str},
-                {"$inc": update_payload, "$set": {"last_updated": datetime.now(timezone.utc)}},
-                upsert=True
-            )
-            logger.info("Archived %s to MongoDB.", day_str)
+        for method, amount in deposits.items():
+            update_payload[f"deposits.{method}"] = amount
 
-        async with self.redis.pipeline() as pipe:
-            pipe.delete(deposit_key, withdrawal_key)
-            pipe.srem(get_tracked_days_key(), day_str)
-            await pipe.execute()
+        for method, amount in withdrawals.items():
+            update_payload[f"withdrawals.{method}"] = amount
 
-            
+        if not update_payload:
+            return None
+
+        return UpdateOne(
+            {"date": day_str},
+            {"$inc": update_payload, "$set": {"last_updated": now}},
+            upsert=True,
+        )
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from datetime import date
+
+from app.services.stats_service import StatsQueryService
+
+
+logger = logging.getLogger(__name__)
+
+
+class StatsRequestBatcher:
+    """
+    Coalesces concurrent /stats queries: requests arriving within
+    wait_timeout_ms of each other are answered by one Redis MGET and one
+    Mongo range query per contiguous run of the union of their days.
+    Up to max_concurrent_batches batches are served at the same time.
+    When a merged read fails, each request is retried on its own.
+    """
+
+    def __init__(
+        self,
+        service: StatsQueryService,
+        max_batch_size: int = 64,
+        wait_timeout_ms: int = 10,
+        max_concurrent_batches: int = 8,
+    ) -> None:
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.wait_timeout = wait_timeout_ms / 1000
+
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+        # In-flight dispatch tasks and the requests each one answers
+        self._inflight: dict[
+            asyncio.Task[None],
+            list[tuple[date, date, asyncio.Future[dict[str, dict]]]],
+        ] = {}
+
+        self._queue: asyncio.Queue[
+            tuple[date, date, asyncio.Future[dict[str, dict]]]
+        ] = asyncio.Queue()
+
+    async def get_range(self, start: date, end: date) -> dict[str, dict]:
+        future: asyncio.Future[dict[str, dict]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        await self._queue.put((start, end, future))
+        return await future
+
+    async def run(self) -> None:
+        logger.info(
+            "Stats batcher started. Max batch: %d, Window: %.0fms",
+            self.max_batch_size, self.wait_timeout * 1000,
+        )
+
+        loop = asyncio.get_running_loop()
+        batch: list[tuple[date, date, asyncio.Future[dict[str, dict]]]] = []
+
+        try:
+            while True:
+                # Wait for a free slot first, so requests keep coalescing
+                # while every slot is busy
+                await self._slots.acquire()
+                try:
+                    batch = [await self._queue.get()]
+                except asyncio.CancelledError:
+                    self._slots.release()
+                    raise
+
+                deadline = loop.time() + self.wait_timeout
+
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self._queue.get(), timeout)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+
+                task = asyncio.create_task(self._dispatch(batch))
+                self._inflight[task] = batch
+                task.add_done_callback(self._on_dispatch_done)
+                batch = []
+
+        except asyncio.CancelledError:
+            logger.info("Stats batcher shut down.")
+
+            # CancelledError is not an Exception, so _dispatch never resolves
+            # its callers on cancel: do it here, or they would hang
+            pending = [batch, *self._inflight.values()]
+            for task in list(self._inflight):
+                task.cancel()
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+            for requests in pending:
+                for _, _, future in requests:
+                    future.cancel()
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                future.cancel()
+            raise
+
+    def _on_dispatch_done(self, task: asyncio.Task[None]) -> None:
+        self._inflight.pop(task, None)
+        self._slots.release()
+
+    async def _dispatch(
+        self,
+        batch: list[tuple[date, date, asyncio.Future[dict[str, dict]]]],
+    ) -> None:
+        try:
+            results = await self.service.get_ranges(
+                [(start, end) for start, end, _ in batch]
+            )
+        except Exception as exc:
+            if len(batch) == 1:
+                logger.exception("Stats request failed")
+                results = [exc]
+            else:
+                # One bad range (e.g. a wide cold query timing out) must not
+                # fail the unrelated requests coalesced with it: retry each
+                # range on its own and only fail the ones that fail again
+                logger.warning(
+                    "Stats batch of %d requests failed, retrying individually: %r",
+                    len(batch), exc,
+                )
+                results = await asyncio.gather(
+                    *(self.service.get_range(start, end) for start, end, _ in batch),
+                    return_exceptions=True,
+                )
+
+        for (_, _, future), result in zip(batch, results):
+            # The caller may have gone away (client disconnect)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -1,11 +1,14 @@
+import asyncio
+import time
 from datetime import date, datetime, timedelta
-from typing import Iterable
 import logging
 
 from motor.motor_asyncio import AsyncIOMotorCollection
 from redis.asyncio import Redis
 
-from app.core.redis_keys import get_agg_key, get_virtual_clock_key
+from app.core.agg_layout import unpack_counters
+from app.core.redis_keys import VIRTUAL_CLOCK_KEY, get_agg_key
+from app.infrastructure.mongo import DATE_COVER_INDEX
 
 
 logger = logging.getLogger(__name__)
@@ -18,20 +21,58 @@ class StatsQueryService:
         redis: Redis,
         mongo: AsyncIOMotorCollection,
         hot_days: int = 7,
+        clock_ttl_seconds: float = 1.0,
+        cold_tile_days: int = 30,
     ):
         self.redis = redis
         self.mongo = mongo
         self.hot_days = hot_days
+        self.clock_ttl = clock_ttl_seconds
+        self.cold_tile_days = max(cold_tile_days, 1)
+
+        # (monotonic fetch time, hot_boundary, virtual_today)
+        self._clock_cache: tuple[float, date, date] | None = None
 
     async def get_range(self, start: date, end: date) -> dict[str, dict]:
-        days = list(self._date_range(start, end))
+        (result,) = await self.get_ranges([(start, end)])
+        return result
+
+    async def get_ranges(
+        self,
+        ranges: list[tuple[date, date]],
+    ) -> list[dict[str, dict]]:
+        """
+        Fetches the union of all requested days once and slices the
+        result back per range, so overlapping windows share reads.
+        """
+        per_range = [self._date_range(start, end) for start, end in ranges]
+
+        if len(per_range) == 1:
+            return [await self._fetch_days(per_range[0])]
+
+        days = sorted({d for range_days in per_range for d in range_days})
+        data = await self._fetch_days(days)
+
+        results: list[dict[str, dict]] = []
+        for range_days in per_range:
+            result: dict[str, dict] = {}
+            for d in range_days:
+                day_str = d.isoformat()
+                if day_str in data:
+                    result[day_str] = data[day_str]
+            results.append(result)
+
+        return results
+
+    async def _fetch_days(self, days: list[date]) -> dict[str, dict]:
+        start, end = days[0], days[-1]
 
         hot_boundary, virtual_today = await self._get_hot_boundary()
 
         redis_days = [d for d in days if d >= hot_boundary]
         mongo_days = [d for d in days if d < hot_boundary]
 
-        logger.info(
+        logger.debug(
             "Stats query [%s -> %s] | virtual_today=%s | hot_boundary=%s | redis_days=%d | mongo_days=%d",
             start,
             end,
@@ -41,25 +82,20 @@ class StatsQueryService:
             len(mongo_days),
         )
 
-        result: dict[str, dict] = {}
-
+        # Hot and cold days live in independent backends: fetch them concurrently,
+        # skipping whichever side has nothing to read
+        readers = []
         if redis_days:
-            redis_data = await self._read_many_from_redis(redis_days)
-            logger.info(
-                "Stats query: fetched %d days from Redis",
-                len(redis_data),
-            )
-            result.update(redis_data)
-
+            readers.append(self._read_many_from_redis(redis_days))
         if mongo_days:
-            mongo_data = await self._read_many_from_mongo(mongo_days)
-            logger.info(
-                "Stats query: fetched %d days from MongoDB",
-                len(mongo_data),
-            )
-            result.update(mongo_data)
+            readers.append(self._read_many_from_mongo(mongo_days))
+
+        # The day sets are disjoint by construction of the hot boundary
+        result: dict[str, dict] = {}
+        for part in await asyncio.gather(*readers):
+            result.update(part)
 
-        logger.info(
+        logger.debug(
             "Stats query finished | total_returned_days=%d",
             len(result),
         )
@@ -75,22 +111,22 @@ class StatsQueryService:
         days: list[date],
     ) -> dict[str, dict]:
 
+        if not days:
+            return {}
+
         logger.debug(
-            "Reading %d days from Redis (pipeline)",
+            "Reading %d days from Redis (MGET)",
             len(days),
         )
 
-        pipe = self.redis.pipeline()
-
+        keys: list[str] = []
         for d in days:
             day_str = d.isoformat()
-            dep_key = get_agg_key(day_str, "deposit")
-            wit_key = get_agg_key(day_str, "withdrawal")
+            keys.append(get_agg_key(day_str, "deposit"))
+            keys.append(get_agg_key(day_str, "withdrawal"))
 
-            pipe.hgetall(dep_key)
-            pipe.hgetall(wit_key)
-
-        raw = await pipe.execute()
+        # One command returns every packed (day, type) value
+        raw = await self.redis.mget(keys)
 
         result: dict[str, dict] = {}
 
@@ -104,12 +140,16 @@ class StatsQueryService:
                 continue
 
             result[d.isoformat()] = {
-                "deposits": {k: float(v) for k, v in dep.items()},
-                "withdrawals": {k: float(v) for k, v in wit.items()},
+                "deposits": self._to_amounts(dep),
+                "withdrawals": self._to_amounts(wit),
             }
 
         return result
 
+    @staticmethod
+    def _to_amounts(value: bytes | None) -> dict[str, float]:
+        return {m: cents / 100 for m, cents in unpack_counters(value).items()}
+
     # ---------------------------------------------------------
     # Mongo
     # ---------------------------------------------------------
@@ -119,21 +159,56 @@ class StatsQueryService:
         days: list[date],
     ) -> dict[str, dict]:
 
+        if not days:
+            return {}
+
         logger.debug(
-            "Reading %d days from MongoDB (single query)",
+            "Reading %d days from MongoDB (%d-day tiles)",
             len(days),
+            self.cold_tile_days,
         )
 
-        day_strings = [d.isoformat() for d in days]
+        # Coalesced windows may be far apart: scan each contiguous run on
+        # its own so the gaps between them are never read. Wide runs are
+        # split further into bounded range scans that run concurrently.
+        tiles = [
+            tile
+            for run in self._contiguous_runs(days)
+            for tile in self._span_tiles(run[0], run[-1])
+        ]
+
+        if len(tiles) == 1:
+            return await self._read_mongo_tile(*tiles[0])
+
+        result: dict[str, dict] = {}
+        for part in await asyncio.gather(*(self._read_mongo_tile(lo, hi) for lo, hi in tiles)):
+            result.update(part)
+
+        return result
 
-        cursor = self.mongo.find(
-            {"date": {"$in": day_strings}},
-            {"_id": 0, "date": 1, "deposits": 1, "withdrawals": 1},
+    async def _read_mongo_tile(
+        self,
+        lo: date,
+        hi: date,
+    ) -> dict[str, dict]:
+
+        # ISO dates sort lexicographically and tiles are contiguous, so one
+        # index range scan returns exactly the requested days
+        cursor = (
+            self.mongo.find(
+                {"date": {"$gte": lo.isoformat(), "$lte": hi.isoformat()}},
+                {"_id": 0, "date": 1, "deposits": 1, "withdrawals": 1},
+            )
+            .batch_size(max((hi - lo).days + 1, 32))
+            .hint(DATE_COVER_INDEX)
         )
 
+        # Drain the cursor in one await instead of one per document
+        docs = await cursor.to_list(length=None)
+
         result: dict[str, dict] = {}
 
-        async for doc in cursor:
+        for doc in docs:
             result[doc["date"]] = {
                 "deposits": doc.get("deposits", {}),
                 "withdrawals": doc.get("withdrawals", {}),
@@ -145,18 +220,41 @@ class StatsQueryService:
     # Utils
     # ---------------------------------------------------------
 
-    def _date_range(self, start: date, end: date) -> Iterable[date]:
-        current = start
-        while current <= end:
-            yield current
-            current += timedelta(days=1)
+    @staticmethod
+    def _contiguous_runs(days: list[date]) -> list[list[date]]:
+        # Splits sorted, unique days wherever consecutive entries skip a day
+        runs = [[days[0]]]
+        for prev, d in zip(days, days[1:]):
+            if d.toordinal() - prev.toordinal() == 1:
+                runs[-1].append(d)
+            else:
+                runs.append([d])
+        return runs
+
+    def _span_tiles(self, start: date, end: date) -> list[tuple[date, date]]:
+        # Calendar windows of at most cold_tile_days over [start, end]
+        start_ord, end_ord = start.toordinal(), end.toordinal()
+        return [
+            (date.fromordinal(lo), date.fromordinal(min(lo + self.cold_tile_days - 1, end_ord)))
+            for lo in range(start_ord, end_ord + 1, self.cold_tile_days)
+        ]
+
+    def _date_range(self, start: date, end: date) -> list[date]:
+        # Ordinals are plain ints: one C call per day, no timedelta per step
+        start_ord = start.toordinal()
+        return [date.fromordinal(start_ord + i) for i in range((end - start).days + 1)]
 
     # ---------------------------------------------------------
     # Virtual clock
     # ---------------------------------------------------------
 
     async def _get_hot_boundary(self) -> tuple[date, date]:
-        raw = await self.redis.get(get_virtual_clock_key())
+        # Sub-second staleness is fine: the clock only moves forward with ingest
+        cached = self._clock_cache
+        if cached is not None and time.monotonic() - cached[0] < self.clock_ttl:
+            return cached[1], cached[2]
+
+        raw = await self.redis.get(VIRTUAL_CLOCK_KEY)
 
         if not raw:
             virtual_today = date.today()
@@ -181,4 +279,6 @@ class StatsQueryService:
             hot_boundary,
         )
 
+        self._clock_cache = (time.monotonic(), hot_boundary, virtual_today)
+
         return hot_boundary, virtual_today
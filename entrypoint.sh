@@ -7,4 +7,4 @@ python app/scripts/pre_processing.py
 
 # 2. Start the application
 echo "Pre-processing complete. Starting FastAPI..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --loop uvloop
\ No newline at end of file